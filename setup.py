@@ -20,6 +20,7 @@ if on_rtd:
     install_requires = []
 else:
     install_requires = ['numpy',
+                        'numba',
                         'pandas',
                         'scikit-image',
                         'joblib',
@@ -1,15 +1,19 @@
 from trojai.datagen.config import ValidInsertLocationsConfig
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Sequence, Any, Tuple, Optional
 
 import numpy as np
-from scipy.ndimage import filters
+from numba import njit
+from scipy.ndimage import maximum_filter1d
 
 import logging
 logger = logging.getLogger(__name__)
 
 # all possible directions to leave pixel along, for edge_tracing algorithm
 DIRECTIONS = [(-1, -1), (-1, 1), (1, 1), (1, -1), (0, -1), (-1, 0), (0, 1), (1, 0)]
+# DIRECTIONS encoded as an array, so the numba compiled edge tracer can loop over them
+_DIRECTIONS_ARR = np.array(DIRECTIONS, dtype=np.int8)
 
 
 def pattern_fit(chan_img: np.ndarray, chan_pattern: np.ndarray, chan_location: Sequence[Any]) -> bool:
@@ -33,6 +37,19 @@ def pattern_fit(chan_img: np.ndarray, chan_pattern: np.ndarray, chan_location: S
     return True
 
 
+def prepare_occupancy(img: np.ndarray) -> np.ndarray:
+    """
+    Cast an image to a boolean occupancy array, with True wherever a pixel is nonzero.  Callers which repeatedly
+    query windows of the same image, e.g. pattern_fit checks followed by overlap tests over many candidate
+    locations, should compute the occupancy once and call .any() on views of it, which walks one byte per pixel
+    and short-circuits at the first occupied pixel
+
+    :param img: a numpy.ndarray image or image channel
+    :return: a boolean numpy.ndarray of the same shape as the input
+    """
+    return img.astype(bool, copy=False)
+
+
 def _get_edge_length_in_direction(curr_i: int, curr_j: int, dir_i: int, dir_j: int, i_rows: int, i_cols: int,
                                   edge_pixels: set) -> int:
     """
@@ -81,6 +98,198 @@ def _get_next_edge_from_pixel(curr_i: int, curr_j: int, i_rows: int, i_cols: int
     return None
 
 
+def _boolean_edges(img_mask: np.ndarray) -> np.ndarray:
+    """
+    Find all edge pixels of a boolean image mask, i.e. every True pixel with at least one False neighbor in its
+    3x3 neighborhood, treating pixels outside the image as False
+    :param img_mask: boolean array with True wherever image is present
+    :return: boolean array with True at every edge pixel
+    """
+    padded = np.zeros((img_mask.shape[0] + 2, img_mask.shape[1] + 2), dtype=bool)
+    padded[1:-1, 1:-1] = img_mask
+
+    # a pixel is interior if all 8 of its neighbors are True, each neighbor checked via a shifted view of the
+    # padded mask
+    interior = (padded[:-2, :-2] & padded[:-2, 1:-1] & padded[:-2, 2:] &
+                padded[1:-1, :-2] & padded[1:-1, 2:] &
+                padded[2:, :-2] & padded[2:, 1:-1] & padded[2:, 2:])
+
+    return img_mask & ~interior
+
+
+def _invalidate_overlap(mask: np.ndarray, img_mask: np.ndarray, p_rows: int, p_cols: int) -> None:
+    """
+    Invalidate in mask every location whose (p_rows, p_cols) insert window contains an image pixel.  Equivalent to
+    invalidating the rectangle of locations upper-left of every edge pixel, computed as a rectangular dilation of
+    the image mask anchored at the window's top-left corner
+    :param mask: boolean array of candidate locations, modified in place
+    :param img_mask: boolean array with True wherever image is present
+    :param p_rows: number of rows of the pattern
+    :param p_cols: number of cols of the pattern
+    :return: None
+    """
+    dilated = maximum_filter1d(img_mask.astype(np.uint8), size=p_rows, axis=0,
+                               mode='constant', cval=0, origin=-(p_rows // 2))
+    dilated = maximum_filter1d(dilated, size=p_cols, axis=1,
+                               mode='constant', cval=0, origin=-(p_cols // 2))
+    mask &= ~dilated.astype(bool)
+
+
+def _shift_rows_down(arr: np.ndarray) -> np.ndarray:
+    """
+    Shift the rows of an array down by one, filling the first row with zeros
+    :param arr: the array to shift
+    :return: the shifted array
+    """
+    shifted = np.zeros_like(arr)
+    shifted[1:] = arr[:-1]
+    return shifted
+
+
+def _shift_rows_up(arr: np.ndarray) -> np.ndarray:
+    """
+    Shift the rows of an array up by one, filling the last row with zeros
+    :param arr: the array to shift
+    :return: the shifted array
+    """
+    shifted = np.zeros_like(arr)
+    shifted[:-1] = arr[1:]
+    return shifted
+
+
+def _edges_packed(img_mask: np.ndarray) -> np.ndarray:
+    """
+    Bit-packed equivalent of _boolean_edges.  Each row of the mask is packed into uint64 words so the 8-neighbor
+    interior test runs on 64 pixels per bitwise operation instead of one byte per element, with a one bit carry
+    between adjacent words supplying the horizontal neighbors across word boundaries
+    :param img_mask: boolean array with True wherever image is present
+    :return: boolean array with True at every edge pixel
+    """
+    i_rows, i_cols = img_mask.shape
+
+    # pad the width up to a multiple of 64 so every row packs into whole uint64 words,
+    # padded columns are False and so behave like the image boundary
+    padded = np.zeros((i_rows, i_cols + (-i_cols % 64)), dtype=np.uint8)
+    padded[:, :i_cols] = img_mask
+    packed = np.packbits(padded, axis=1, bitorder='little').view(np.uint64)
+
+    # horizontal neighbors: 1-bit shift within each word plus the borrowed bit from the adjacent word
+    carry = np.zeros_like(packed)
+    carry[:, 1:] = packed[:, :-1] >> np.uint64(63)
+    west = (packed << np.uint64(1)) | carry
+    carry = np.zeros_like(packed)
+    carry[:, :-1] = packed[:, 1:] << np.uint64(63)
+    east = (packed >> np.uint64(1)) | carry
+
+    # vertical neighbors are whole-row shifts of the packed words
+    interior = (_shift_rows_down(packed) & _shift_rows_up(packed) & west & east &
+                _shift_rows_down(west) & _shift_rows_down(east) &
+                _shift_rows_up(west) & _shift_rows_up(east))
+
+    edges = packed & ~interior
+    return np.unpackbits(edges.view(np.uint8), axis=1, bitorder='little')[:, :i_cols].astype(bool)
+
+
+@njit(cache=True, nogil=True)
+def _edge_trace_rects(edge_mask: np.ndarray, edge_coords: np.ndarray, rects: np.ndarray,
+                      p_rows: int, p_cols: int) -> int:
+    """
+    Trace the perimeter of the image, recording each rectangle of locations whose pattern insert would overlap an
+    edge pixel.  Compiled equivalent of the pure-python edge walk performed by _get_next_edge_from_pixel, with the
+    visited set replaced by a boolean array so the traversal runs as tight numeric loops.  The rectangles are
+    rasterized by the caller in one batched pass rather than stored scattershot during the walk
+    :param edge_mask: boolean array with True at every edge pixel, modified in place as pixels are visited
+    :param edge_coords: (N, 2) array of the row/col coordinates of all edge pixels
+    :param rects: (3N + 1, 4) output array receiving (top, bottom, left, right) rows, bottom/right exclusive
+    :param p_rows: number of rows of the pattern
+    :param p_cols: number of cols of the pattern
+    :return: the number of rectangles recorded
+    """
+    i_rows, i_cols = edge_mask.shape
+    num_dirs = _DIRECTIONS_ARR.shape[0]
+    num_rects = 0
+
+    # search until all edges have been visited
+    for idx in range(edge_coords.shape[0]):
+        start_i = edge_coords[idx, 0]
+        start_j = edge_coords[idx, 1]
+        if not edge_mask[start_i, start_j]:
+            continue
+        edge_mask[start_i, start_j] = False
+
+        # invalidate relevant pixels for start square
+        rects[num_rects, 0] = max(0, start_i - p_rows + 1)
+        rects[num_rects, 1] = start_i + 1
+        rects[num_rects, 2] = max(0, start_j - p_cols + 1)
+        rects[num_rects, 3] = start_j + 1
+        num_rects += 1
+
+        curr_i, curr_j = start_i, start_j
+        while True:
+            # find the next edge to trace along, taking the maximum length move in each direction along the
+            # perimeter, only allowing length 1 diagonal moves
+            action_i, action_j = 0, 0
+            for d in range(num_dirs):
+                dir_i = _DIRECTIONS_ARR[d, 0]
+                dir_j = _DIRECTIONS_ARR[d, 1]
+                length = 0
+                while 0 <= curr_i + dir_i * (length + 1) < i_rows and 0 <= curr_j + dir_j * (length + 1) < i_cols \
+                        and edge_mask[curr_i + dir_i * (length + 1), curr_j + dir_j * (length + 1)]:
+                    # update seen edge pixels
+                    edge_mask[curr_i + dir_i * (length + 1), curr_j + dir_j * (length + 1)] = False
+                    length += 1
+                    if dir_i != 0 and dir_j != 0:
+                        break
+                if length != 0:
+                    action_i = dir_i * length
+                    action_j = dir_j * length
+                    break
+            if action_i == 0 and action_j == 0:
+                break
+
+            # current location
+            curr_i += action_i
+            curr_j += action_j
+
+            # truncate search when near top or left boundary
+            top_index = max(0, curr_i - p_rows + 1)
+            left_index = max(0, curr_j - p_cols + 1)
+
+            # record invalidation based on last move, marking a row or column invalid based on the size
+            # of action_i or action_j
+            if action_i < 0:
+                # update top border
+                rects[num_rects, 0] = top_index
+                rects[num_rects, 1] = top_index - action_i
+                rects[num_rects, 2] = left_index
+                rects[num_rects, 3] = curr_j + 1
+                num_rects += 1
+            elif action_i > 0:
+                # update bottom border
+                rects[num_rects, 0] = curr_i - action_i + 1
+                rects[num_rects, 1] = curr_i + 1
+                rects[num_rects, 2] = left_index
+                rects[num_rects, 3] = curr_j + 1
+                num_rects += 1
+
+            if action_j < 0:
+                # update left border
+                rects[num_rects, 0] = top_index
+                rects[num_rects, 1] = curr_i + 1
+                rects[num_rects, 2] = left_index
+                rects[num_rects, 3] = left_index - action_j
+                num_rects += 1
+            elif action_j > 0:
+                # update right border
+                rects[num_rects, 0] = top_index
+                rects[num_rects, 1] = curr_i + 1
+                rects[num_rects, 2] = curr_j - action_j + 1
+                rects[num_rects, 3] = curr_j + 1
+                num_rects += 1
+
+    return num_rects
+
+
 def _get_bounding_box(coords: Sequence[int], img: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
     """
     Return the smallest possible rectangle containing all non-zero pixels in img, edges inclusive
@@ -92,23 +301,128 @@ def _get_bounding_box(coords: Sequence[int], img: np.ndarray) -> Optional[Tuple[
     top, left, bottom, right = coords
     img_subset = img[top:bottom, left:right]
 
-    rows = np.logical_or.reduce(img_subset, axis=1)
-    cols = np.logical_or.reduce(img_subset, axis=0)
+    rows = img_subset.any(axis=1)
+    cols = img_subset.any(axis=0)
 
-    row_bounds = np.nonzero(rows)
-    col_bounds = np.nonzero(cols)
+    row_bounds = np.flatnonzero(rows)
+    if row_bounds.size == 0:
+        return 0, 0, 0, 0
+    col_bounds = np.flatnonzero(cols)
 
-    if row_bounds[0].size != 0 and col_bounds[0].size != 0:
-        y1 = row_bounds[0][0]
-        y2 = row_bounds[0][row_bounds[0].size - 1]
+    return top + row_bounds[0], left + col_bounds[0], top + row_bounds[-1] + 1, left + col_bounds[-1] + 1
 
-        x1 = col_bounds[0][0]
-        x2 = col_bounds[0][col_bounds[0].size - 1]
 
-        return top + y1, left + x1, top + y2 + 1, left + x2 + 1
+def _broadcast_per_channel(value: Any, num_chans: int, name: str) -> Sequence[Any]:
+    """
+    Broadcast a scalar configuration value to one entry per channel, validating the length of provided sequences
+    :param value: the scalar or per-channel sequence to broadcast
+    :param num_chans: number of channels in the image
+    :param name: name of the configuration value, used in the error message
+    :return: a sequence with one entry per channel
+    """
+    if not isinstance(value, Sequence):
+        return [value] * num_chans
+    if len(value) != num_chans:
+        msg = "Length of provided %s sequence does not equal the number of channels in the image!" % name
+        logger.error(msg)
+        raise ValueError(msg)
+    return value
 
-    else:
-        return 0, 0, 0, 0
+
+def _channel_valid_locations(chan_img: np.ndarray, mask: np.ndarray, img_mask: np.ndarray,
+                             algo_config: ValidInsertLocationsConfig, p_rows: int, p_cols: int,
+                             threshold_val: Optional[float]) -> None:
+    """
+    Run the configured algorithm over a single image channel, invalidating locations in mask in place
+    :param chan_img: a numpy.ndarray of shape (nrows, ncols) which represents an image channel
+    :param mask: boolean array of candidate locations for this channel, modified in place
+    :param img_mask: boolean array with True wherever image is present in this channel
+    :param algo_config: The provided configuration object specifying the algorithm to use and necessary parameters
+    :param p_rows: number of rows of the pattern
+    :param p_cols: number of cols of the pattern
+    :param threshold_val: the threshold value for this channel, only needed for threshold
+    :return: None
+    """
+    i_rows, i_cols = chan_img.shape
+
+    # a channel with no image content has nothing to invalidate beyond the boundary trim,
+    # skip the edge detection and algorithm dispatch entirely
+    if not img_mask.any():
+        return
+
+    if algo_config.algorithm == 'edge_tracing':
+        logger.info("Computing valid locations according to edge_tracing algorithm")
+        edge_mask = _edges_packed(img_mask)
+        edge_coords = np.argwhere(edge_mask).astype(np.int32)
+
+        # each trace start contributes one rectangle and each move at most two
+        rects = np.empty((3 * edge_coords.shape[0] + 1, 4), dtype=np.int32)
+        num_rects = _edge_trace_rects(edge_mask, edge_coords, rects, p_rows, p_cols)
+        rects = rects[:num_rects]
+
+        # rasterize the union of all rectangles in one batched pass: +/-1 at each rectangle's corners,
+        # then a 2-D cumsum leaves a nonzero count on every covered location
+        corners = np.zeros((i_rows + 1, i_cols + 1), dtype=np.int32)
+        np.add.at(corners, (rects[:, 0], rects[:, 2]), 1)
+        np.add.at(corners, (rects[:, 0], rects[:, 3]), -1)
+        np.add.at(corners, (rects[:, 1], rects[:, 2]), -1)
+        np.add.at(corners, (rects[:, 1], rects[:, 3]), 1)
+        covered = corners.cumsum(axis=0).cumsum(axis=1)[:i_rows, :i_cols] != 0
+        mask &= np.logical_not(covered)
+
+    elif algo_config.algorithm == 'brute_force':
+        logger.info("Computing valid locations according to brute_force algorithm")
+        _invalidate_overlap(mask, img_mask, p_rows, p_cols)
+
+    elif algo_config.algorithm == 'threshold':
+        logger.info("Computing valid locations according to threshold algorithm")
+        _invalidate_overlap(mask, img_mask, p_rows, p_cols)
+
+        # if average pixel value in an invalidated location is below specified value, allow possible
+        # trigger overlap, with each window sum read in O(1) from a summed-area table of the channel
+        integral = np.zeros((i_rows + 1, i_cols + 1))
+        integral[1:, 1:] = np.cumsum(np.cumsum(chan_img, axis=0, dtype=np.float64), axis=1)
+        i_idx, j_idx = np.nonzero(
+            np.logical_not(mask[:max(0, i_rows - p_rows + 1), :max(0, i_cols - p_cols + 1)]))
+        window_sums = (integral[i_idx + p_rows, j_idx + p_cols] - integral[i_idx, j_idx + p_cols] -
+                       integral[i_idx + p_rows, j_idx] + integral[i_idx, j_idx])
+        mask[i_idx, j_idx] = window_sums <= threshold_val * (p_rows * p_cols)
+
+    elif algo_config.algorithm == 'bounding_boxes':
+        logger.info("Computing valid locations according to bounding_boxes algorithm")
+        num_boxes = algo_config.num_boxes
+
+        # grid tile k spans [starts[k], starts[k + 1]) along each axis
+        row_starts = (np.arange(num_boxes) * i_rows) // num_boxes
+        col_starts = (np.arange(num_boxes) * i_cols) // num_boxes
+
+        # presence of image per row within each tile column and per column within each tile row,
+        # reduced over all tiles in one pass instead of re-slicing the mask per grid square
+        row_any = np.add.reduceat(img_mask, col_starts, axis=1) > 0
+        col_any = np.add.reduceat(img_mask, row_starts, axis=0) > 0
+
+        # first/last present row and column per tile via min/max over sentinel-filled index grids,
+        # each of shape (num_boxes, num_boxes)
+        r_idx = np.arange(i_rows)[:, np.newaxis]
+        tops = np.minimum.reduceat(np.where(row_any, r_idx, i_rows), row_starts, axis=0)
+        bottoms = np.maximum.reduceat(np.where(row_any, r_idx, -1), row_starts, axis=0)
+        c_idx = np.arange(i_cols)[np.newaxis, :]
+        lefts = np.minimum.reduceat(np.where(col_any, c_idx, i_cols), col_starts, axis=1)
+        rights = np.maximum.reduceat(np.where(col_any, c_idx, -1), col_starts, axis=1)
+
+        # tiles thinner than one pixel (num_boxes > image extent) repeat their start index in reduceat,
+        # treat them as empty like the sliced bounding box computation did
+        seg_rows = np.diff(np.append(row_starts, i_rows))
+        seg_cols = np.diff(np.append(col_starts, i_cols))
+
+        # update mask from each non-empty tile's bounding box
+        for box_i in range(num_boxes):
+            for box_j in range(num_boxes):
+                if bottoms[box_i, box_j] < 0 or seg_rows[box_i] == 0 or seg_cols[box_j] == 0:
+                    continue
+                top_index = max(0, tops[box_i, box_j] - p_rows + 1)
+                left_index = max(0, lefts[box_i, box_j] - p_cols + 1)
+                mask[top_index:bottoms[box_i, box_j] + 1, left_index:rights[box_i, box_j] + 1] = False
 
 
 def valid_locations(img: np.ndarray, pattern: np.ndarray, algo_config: ValidInsertLocationsConfig,
@@ -131,33 +445,12 @@ def valid_locations(img: np.ndarray, pattern: np.ndarray, algo_config: ValidInse
     """
     num_chans = img.shape[2]
 
-    # broadcast allow_overlap variable if necessary
-    allow_overlap = algo_config.allow_overlap
-    if not isinstance(allow_overlap, Sequence):
-        allow_overlap = [allow_overlap] * num_chans
-    elif len(allow_overlap) != num_chans:
-        msg = "Length of provided allow_overlap sequence does not equal the number of channels in the image!"
-        logger.error(msg)
-        raise ValueError(msg)
-
-    # broadcast min_val variable if necessary
-    min_val = algo_config.min_val
-    if not isinstance(min_val, Sequence):
-        min_val = [min_val] * num_chans
-    elif len(min_val) != num_chans:
-        msg = "Length of provided min_val sequence does not equal the number of channels in the image!"
-        logger.error(msg)
-        raise ValueError(msg)
-
-    # broadcast threshold_val variable if necessary
+    # broadcast the per-channel configuration values if necessary
+    allow_overlap = _broadcast_per_channel(algo_config.allow_overlap, num_chans, 'allow_overlap')
+    min_val = _broadcast_per_channel(algo_config.min_val, num_chans, 'min_val')
     threshold_val = algo_config.threshold_val
     if algo_config.algorithm == 'threshold':
-        if not isinstance(threshold_val, Sequence):
-            threshold_val = [threshold_val] * num_chans
-        elif len(threshold_val) != num_chans:
-            msg = "Length of provided threshold_val sequence does not equal the number of channels in the image!"
-            logger.error(msg)
-            raise ValueError(msg)
+        threshold_val = _broadcast_per_channel(threshold_val, num_chans, 'threshold_val')
 
     if pattern.shape[2] != num_chans:
         # force user to broadcast the pattern as necessary
@@ -165,134 +458,53 @@ def valid_locations(img: np.ndarray, pattern: np.ndarray, algo_config: ValidInse
         logger.error(msg)
         raise ValueError(msg)
 
-    # TODO: look for vectorization opportunities
+    i_rows, i_cols = img.shape[0:2]
+    p_rows, p_cols = pattern.shape[0:2]
+
+    allow_overlap = np.asarray(allow_overlap, dtype=bool)
     output_mask = np.zeros(img.shape, dtype=bool)
-    for chan_idx in range(num_chans):
-        chan_img = img[:, :, chan_idx]
-        chan_pattern = pattern[:, :, chan_idx]
-        i_rows, i_cols = chan_img.shape
-        p_rows, p_cols = chan_pattern.shape
-
-        if allow_overlap[chan_idx]:
-            output_mask[0:i_rows - p_rows + 1,
-                        0:i_cols - p_cols + 1,
-                        chan_idx] = True
+
+    # channels which allow overlap are valid everywhere the pattern fits, set in one shot across channels
+    if allow_overlap.any():
+        output_mask[0:i_rows - p_rows + 1,
+                    0:i_cols - p_cols + 1,
+                    allow_overlap] = True
+
+    protect_chans = np.flatnonzero(np.logical_not(allow_overlap))
+    if protect_chans.size != 0:
+        if not protect_wrap:
+            msg = "Wrapping for trigger insertion has not been implemented yet!"
+            logger.error(msg)
+            raise ValueError(msg)
+
+        # compute the background and image-present masks for all channels in one traversal of img,
+        # min_val broadcast across the trailing channel axis, written into preallocated contiguous
+        # buffers instead of expression temporaries
+        img = np.ascontiguousarray(img)
+        mask3 = np.empty(img.shape, dtype=bool)
+        np.less_equal(img, np.asarray(min_val).reshape((1, 1, num_chans)), out=mask3)
+
+        # True if image present, False if not
+        img_mask3 = np.empty_like(mask3)
+        np.invert(mask3, out=img_mask3)
+
+        # remove boundaries from valid locations
+        mask3[i_rows - p_rows + 1:i_rows, :, :] = False
+        mask3[:, i_cols - p_cols + 1:i_cols, :] = False
+
+        def _run_channel(chan_idx: int) -> None:
+            _channel_valid_locations(img[:, :, chan_idx], mask3[:, :, chan_idx], img_mask3[:, :, chan_idx],
+                                     algo_config, p_rows, p_cols,
+                                     threshold_val[chan_idx] if algo_config.algorithm == 'threshold' else None)
+
+        # the remaining per-channel work is algorithm-specific and independent across channels, so run it on a
+        # thread pool; the numpy/scipy calls and the nogil numba kernel release the GIL while they work
+        if protect_chans.size > 1:
+            with ThreadPoolExecutor(max_workers=protect_chans.size) as executor:
+                list(executor.map(_run_channel, protect_chans))
         else:
-            if protect_wrap:
-                mask = (chan_img <= min_val[chan_idx])
-
-                # True if image present, False if not
-                img_mask = np.logical_not(mask)
-
-                # remove boundaries from valid locations
-                mask[i_rows - p_rows + 1:i_rows, :] = False
-                mask[:, i_cols - p_cols + 1:i_cols] = False
-
-                # get all edge pixels
-                edge_pixels = None
-                if algo_config.algorithm != 'bounding_box':
-                    edge_pixel_coords = np.nonzero(
-                                            np.logical_and(
-                                                np.logical_xor(
-                                                    filters.maximum_filter(img_mask, 3, mode='constant', cval=0.0),
-                                                    filters.minimum_filter(img_mask, 3, mode='constant', cval=0.0)),
-                                                img_mask))
-                    edge_pixels = zip(edge_pixel_coords[0], edge_pixel_coords[1])
-
-                if algo_config.algorithm == 'edge_tracing':
-                    logger.info("Computing valid locations according to edge_tracing algorithm")
-                    edge_pixel_set = set(edge_pixels)
-                    # search until all edges have been visited
-                    while len(edge_pixel_set) != 0:
-                        start_i, start_j = edge_pixel_set.pop()
-
-                        # invalidate relevant pixels for start square
-                        top_boundary = max(0, start_i - p_rows + 1)
-                        left_boundary = max(0, start_j - p_cols + 1)
-                        mask[top_boundary:start_i + 1,
-                             left_boundary: start_j + 1] = False
-
-                        curr_i, curr_j = start_i, start_j
-                        move = 0, 0
-                        while move is not None:
-                            # what edge was last traversed
-                            action_i, action_j = move
-                            # current location
-                            curr_i += action_i
-                            curr_j += action_j
-
-                            # truncate search when near top or left boundary
-                            top_index = max(0, curr_i - p_rows + 1)
-                            left_index = max(0, curr_j - p_cols + 1)
-
-                            # update invalidation based on last move, marking a row or column invalid based on the size
-                            # of action_i or action_j
-                            # if action_i or action_j has absolute value greater than 0, the other must be 0,
-                            # i.e diagonal moves of length greater than 1 aren't updated correctly by this
-                            if action_i < 0:
-                                # update top border
-                                mask[top_index:top_index - action_i, left_index:curr_j + 1] = False
-                            elif action_i > 0:
-                                # update bottom border
-                                mask[curr_i - action_i + 1:curr_i + 1, left_index:curr_j + 1] = False
-
-                            if action_j < 0:
-                                # update left border
-                                mask[top_index:curr_i + 1, left_index:left_index - action_j] = False
-                            elif action_j > 0:
-                                # update right border
-                                mask[top_index:curr_i + 1, curr_j - action_j + 1:curr_j + 1] = False
-
-                            # obtain next pixel to inspect
-                            move = _get_next_edge_from_pixel(curr_i, curr_j, i_rows, i_cols, edge_pixel_set)
-
-                elif algo_config.algorithm == 'brute_force':
-                    logger.info("Computing valid locations according to brute_force algorithm")
-                    for i, j in edge_pixels:
-                        top_index, left_index = max(0, i - p_rows + 1), max(0, j - p_cols + 1)
-                        mask[top_index:i + 1, left_index:j + 1] = False
-
-                elif algo_config.algorithm == 'threshold':
-                    logger.info("Computing valid locations according to threshold algorithm")
-                    for i, j in edge_pixels:
-                        mask[max(0, i - p_rows + 1):i + 1, max(0, j - p_cols + 1):j + 1] = False
-
-                    # enumerate all possible invalid locations
-                    mask_coords = np.nonzero(np.logical_not(mask))
-                    possible_locations = zip(mask_coords[0], mask_coords[1])
-
-                    # if average pixel value in location is below specified value, allow possible trigger overlap
-                    for i, j in possible_locations:
-                        if i <= i_rows - p_rows and j <= i_cols - p_cols and \
-                                np.mean(chan_img[i:i + p_rows, j:j + p_cols]) <= threshold_val[chan_idx]:
-                            mask[i][j] = True
-
-                elif algo_config.algorithm == 'bounding_boxes':
-                    logger.info("Computing valid locations according to bounding_boxes algorithm")
-                    # generate top-left and bottom-right corners of all grid squares
-                    top_left_coords = np.swapaxes(np.indices((algo_config.num_boxes, algo_config.num_boxes)), 0, 2) \
-                                        .reshape((algo_config.num_boxes * algo_config.num_boxes, 2))
-                    bottom_right_coords = top_left_coords + 1
-
-                    # rows give y1, x1, y2, x2 of grid boxes, y2 and x2 exclusive
-                    box_coords = np.concatenate((top_left_coords, bottom_right_coords), axis=1)
-                    box_coords = np.multiply(box_coords, np.array([i_rows, i_cols, i_rows, i_cols]))
-                    box_coords //= algo_config.num_boxes
-
-                    # generate bounding boxes for image in each grid square
-                    bounding_coords = np.apply_along_axis(_get_bounding_box, 1, box_coords, img_mask)
-
-                    # update mask, bounds -> top, left, bottom, right
-                    for bounds in bounding_coords:
-                        top_index = max(0, bounds[0] - p_rows + 1)
-                        left_index = max(0, bounds[1] - p_cols + 1)
-                        mask[top_index:bounds[2], left_index:bounds[3]] = False
-
-                output_mask[:, :, chan_idx] = mask
-
-            else:
-                msg = "Wrapping for trigger insertion has not been implemented yet!"
-                logger.error(msg)
-                raise ValueError(msg)
+            _run_channel(protect_chans[0])
+
+        output_mask[:, :, protect_chans] = mask3[:, :, protect_chans]
 
     return output_mask
@@ -123,21 +123,22 @@ class InsertAtRandomLocation(ImageMerge):
             # trigger same across all channels
             if num_chans == 3:
                 valid_location_mask = np.bitwise_and.reduce(valid_location_mask, axis=2)
-            valid_locs = np.nonzero(valid_location_mask)
-            if len(valid_locs[0]) == 0:
+            valid_locs = np.argwhere(valid_location_mask)
+            if valid_locs.shape[0] == 0:
                 # TODO: link back to this image's file pointer in error msg
                 warnings.warn('Image contains no space for trigger w/out '
                               'occlusion!  Placing trigger on upper left w/ '
                               'possible partial occlusion!')
-                valid_locs = np.asarray([[0, 0]] * num_chans).T
+                valid_locs = np.zeros((1, 2), dtype=np.int16)
                 idx_select = 0
             else:
-                idx_select = random_state_obj.choice(np.arange(len(valid_locs[0])))
+                idx_select = random_state_obj.choice(np.arange(valid_locs.shape[0]))
             logger.info("Selected random location for insertion")
 
             insert_locs_per_chan = np.empty((num_chans, 2), dtype=np.int16)
-            for chan_idx in range(num_chans):
-                insert_locs_per_chan[chan_idx, :] = [valid_locs[0][idx_select], valid_locs[1][idx_select]]
+            # rows of valid_locs are (row, col) pairs, or (row, col, chan) triples when the mask was not
+            # reduced across channels - only the row/col of the selection is used either way
+            insert_locs_per_chan[:] = valid_locs[idx_select][:2]
             logger.info("Inserted pattern into image")
 
         else:
@@ -5,8 +5,8 @@ from numpy.random import RandomState
 
 from trojai.datagen import image_insert_utils
 from trojai.datagen.config import ValidInsertLocationsConfig
-from trojai.datagen.image_insert_utils import _get_edge_length_in_direction, _get_next_edge_from_pixel, _get_bounding_box, \
-                                        valid_locations
+from trojai.datagen.image_insert_utils import _boolean_edges, _edges_packed, _get_edge_length_in_direction, \
+                                        _get_next_edge_from_pixel, _get_bounding_box, valid_locations
 
 
 class TestInsertUtils(unittest.TestCase):
@@ -81,6 +81,29 @@ class TestInsertUtils(unittest.TestCase):
             self.assertTrue(np.array_equal(expected_valid_locations,
                                            actual_valid_locations))
 
+    def test_boolean_edges(self):
+        img_mask = np.zeros((21, 21), dtype=bool)
+        img_mask[5:10, 5:10] = True
+        expected_edges = np.zeros((21, 21), dtype=bool)
+        expected_edges[5:10, 5:10] = True
+        expected_edges[6:9, 6:9] = False
+        self.assertTrue(np.array_equal(_boolean_edges(img_mask), expected_edges))
+        # pixels on the image boundary are edges
+        img_mask = np.ones((5, 5), dtype=bool)
+        expected_edges = np.ones((5, 5), dtype=bool)
+        expected_edges[1:4, 1:4] = False
+        self.assertTrue(np.array_equal(_boolean_edges(img_mask), expected_edges))
+        self.assertFalse(_boolean_edges(np.zeros((5, 5), dtype=bool)).any())
+
+    def test_edges_packed(self):
+        # the packed detector must agree with the unpacked one, in particular across uint64 word boundaries
+        random_state = RandomState(1234)
+        for repetition in range(20):
+            h = random_state.randint(1, 100)
+            w = random_state.choice([1, 63, 64, 65, 128, random_state.randint(1, 200)])
+            img_mask = random_state.rand(h, w) < random_state.rand()
+            self.assertTrue(np.array_equal(_edges_packed(img_mask), _boolean_edges(img_mask)))
+
     def test_get_edge_length_in_direction(self):
         img = np.zeros((21, 21))
         img[5:10, 5:10] = 1
@@ -127,11 +150,12 @@ class TestInsertUtils(unittest.TestCase):
                 img = np.zeros((h, w, 3)).astype(np.uint8)
                 img[lo_h:hi_h, lo_w:hi_w] = np.random.randint(0, 2, (hi_h - lo_h, hi_w - lo_w, 3))
                 locations = valid_locations(img, pattern, config)
+                img_bool = image_insert_utils.prepare_occupancy(img)
                 for i in range(img.shape[0]):
                     for j in range(img.shape[1]):
                         for c in range(img.shape[2]):
                             if locations[i][j][c]:
-                                self.assertFalse(np.logical_or.reduce(img[i:i + 10, j:j + 10, c], axis=None))
+                                self.assertFalse(img_bool[i:i + 10, j:j + 10, c].any())
 
 
 if __name__ == '__main__':
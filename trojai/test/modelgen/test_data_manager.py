@@ -1,5 +1,6 @@
 import unittest
 import tempfile
+import shutil
 import os
 
 import pandas as pd
@@ -13,31 +14,26 @@ def create_df(path, test_filename, empty_filename):
     df.to_csv(os.path.join(path, test_filename), index=False)
     empty_df = pd.DataFrame([], [], ['col1', 'col2', 'train_label', 'true_label'])
     empty_df.to_csv(os.path.join(path, empty_filename), index=False)
+    return df
 
 
 class TestDataManager(unittest.TestCase):
-    tmp_dir = None
-
     @classmethod
     def setUpClass(cls):
-        pass
+        # no test mutates the CSVs, so write them once into a class-scoped unique directory,
+        # which also keeps parallel test runners from colliding
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.path = cls.tmp_dir
+        cls.file = 'test_file.csv'
+        cls.empty_file = "empty_file.csv"
+        cls.expected_df = create_df(cls.path, cls.file, cls.empty_file)
+
+        cls.bad_path = './bad_dir'
+        cls.bad_file = 'bad_file.csv'
 
     @classmethod
     def tearDownClass(cls):
-        pass
-
-    def setUp(self):
-        self.tmp_dir = tempfile.TemporaryDirectory()
-        self.path = self.tmp_dir.name
-        self.file = 'test_file.csv'
-        self.empty_file = "empty_file.csv"
-        create_df(self.path, self.file, self.empty_file)
-
-        self.bad_path = './bad_dir'
-        self.bad_file = 'bad_file.csv'
-
-    def tearDown(self):
-        self.tmp_dir.cleanup()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
 
     def test_good_params(self):
         # basic version
@@ -101,7 +97,7 @@ class TestDataManager(unittest.TestCase):
         self.assertIsInstance(d2, CSVDataset)
         self.assertIsInstance(d3, CSVDataset)
         self.assertIsInstance(d4, CSVDataset)
-        df = pd.DataFrame([[1, 0, 0, 0], [0, 1, 1, 1]], [0, 1], ['col1', 'col2', 'train_label', 'true_label'])
+        df = self.expected_df
         self.assertTrue(d1.data_df.equals(df))
         self.assertTrue(d2.data_df.equals(df))
         self.assertTrue(d3.data_df.equals(df))